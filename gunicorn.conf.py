@@ -0,0 +1,20 @@
+# Прод-запуск: gunicorn server:app (конфиг подхватывается из текущей папки)
+import multiprocessing
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+bind         = f"0.0.0.0:{os.getenv('PORT', 3000)}"
+# У каждого воркера свой лимитер, свой кэш JSON и свой поллер MC. Без REDIS_URL N воркеров —
+# это N× попыток пароля на /auth и /api/reset, поэтому по умолчанию один воркер (конкурентность дают потоки).
+# С Redis лимит общий и воркеров можно по числу ядер, но MC всё равно пингуется N раз за тик
+workers      = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() if os.getenv("REDIS_URL") else 1))
+# Настоящие потоки ОС, как у waitress в server.py: fsync фонового писателя JSON и asyncio-поллер MC
+# работают рядом с запросами и не останавливают их (у gevent файловый I/O блокирует весь воркер)
+worker_class = "gthread"
+threads      = int(os.getenv("GUNICORN_THREADS", 16))
+# SO_REUSEPORT на слушающем сокете: несколько инстансов gunicorn могут слушать один порт,
+# у каждого своя очередь accept, а ядро раскидывает между ними соединения
+reuse_port   = True
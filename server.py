@@ -1,3 +1,5 @@
+import asyncio
+import atexit
 import hashlib
 import hmac
 import os
@@ -5,77 +7,189 @@ import time
 import json
 import socket
 import struct
-from collections import defaultdict
+from collections import OrderedDict
 from pathlib import Path
-from threading import Thread, Lock
+from queue import Empty, Queue
+from threading import Lock, Thread, Timer
 
 from dotenv import load_dotenv
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Response, abort, request
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import redis
+except ImportError:
+    redis = None
 
 load_dotenv()
 
 ADMIN_PASSWORD_HASH: str = os.getenv("ADMIN_PASSWORD_HASH", "").lower()
 PORT: int                = int(os.getenv("PORT", 3000))
+try: _ADMIN_DIGEST = bytes.fromhex(ADMIN_PASSWORD_HASH)
+except ValueError: _ADMIN_DIGEST = b""
 NEWS_FILE = Path("news.json")
 DOCS_FILE = Path("docs.json")
 
 MC_HOST = os.getenv("MC_HOST", "blissfull.mc-server.net")
 MC_PORT = int(os.getenv("MC_PORT", 25816))
 
+REDIS_URL = os.getenv("REDIS_URL", "")
+# Сколько reverse proxy стоит перед приложением (0 — напрямую в интернет)
+TRUSTED_PROXIES = int(os.getenv("TRUSTED_PROXIES", 1))
+
 app = Flask(__name__, static_folder=".")
+# За reverse proxy: remote_addr берётся из X-Forwarded-For один раз, на уровне WSGI —
+# ровно TRUSTED_PROXIES-й адрес справа; левые записи (access_route[0]) клиент подделывает сам
+if TRUSTED_PROXIES: app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES)
 CORS(app, origins=["*"], methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])
 
 RATE_WINDOW = 60
 RATE_MAX    = 10
-_rate_store: dict = defaultdict(lambda: {"count": 0, "reset_at": 0})
-_status_cache = {"data": None, "updated_at": 0}
-_status_lock  = Lock()
+RATE_MAX_IPS = 100_000
+# GCRA: каждый запрос сдвигает TAT на RATE_INTERVAL; пропускаем, пока TAT не убежал дальше RATE_BURST
+RATE_INTERVAL = RATE_WINDOW / RATE_MAX
+RATE_BURST    = RATE_WINDOW - RATE_INTERVAL
+# ip -> TAT (theoretical arrival time); LRU-порядок, при переполнении вытесняется самый давний IP
+_rate_store: OrderedDict[str, float] = OrderedDict()
+_rate_lock = Lock()
+# Каждые RATE_SWEEP_EVERY проверок чистим голову LRU от IP с восстановленным лимитом
+RATE_SWEEP_EVERY = 1024
+_rate_calls = 0
+# Общий для всех воркеров счётчик; без REDIS_URL лимит считается в памяти процесса.
+# Короткие таймауты: недоступный Redis не должен вешать /auth — сразу уходим на локальный лимитер
+REDIS_TIMEOUT = 0.5
+_rate_redis = (redis.Redis.from_url(REDIS_URL, socket_timeout=REDIS_TIMEOUT, socket_connect_timeout=REDIS_TIMEOUT)
+               if redis and REDIS_URL else None)
+STATUS_INTERVAL  = 10
+STATUS_MAX_DELAY = 300
+STATUS_TIMEOUT   = 5.0
+
+# ── JSON ──────────────────────────────────────────────────────────────────
+# orjson в разы быстрее stdlib json и сразу отдаёт bytes; без него — фолбэк
+def _dumps(obj, indent: bool = False) -> bytes:
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0))
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode("utf-8")
+
+def _loads(data: bytes):
+    return orjson.loads(data) if orjson else json.loads(data)
+
+def _json_response(payload, status: int = 200) -> Response:
+    return Response(_dumps(payload), status=status, mimetype="application/json")
+
+def _etag(body: bytes) -> str:
+    return hashlib.blake2b(body, digest_size=8).hexdigest()
+
+def _cached_response(body: bytes, etag: str, cache_control: str = "no-cache") -> Response:
+    """Готовое JSON-тело с ETag; на совпавший If-None-Match — пустой 304.
+    По умолчанию no-cache: браузер хранит ответ, но каждый раз сверяет ETag"""
+    if request.if_none_match.contains_weak(etag):
+        resp = Response(status=304)
+    else:
+        resp = Response(body, mimetype="application/json")
+    resp.set_etag(etag, weak=True)
+    resp.headers["Cache-Control"] = cache_control
+    return resp
 
 # ── Rate limit ────────────────────────────────────────────────────────────
+def _check_rate_limit_redis(ip: str) -> bool:
+    # INCR + EXPIRE NX в MULTI — фиксированное окно за один round-trip; TTL ставится тому,
+    # кто создал ключ, даже если старый истёк прямо перед INCR (EXPIRE NX — Redis 7+)
+    pipe = _rate_redis.pipeline()
+    pipe.incr(f"rl:{ip}")
+    pipe.expire(f"rl:{ip}", RATE_WINDOW, nx=True)
+    return pipe.execute()[0] <= RATE_MAX
+
 def check_rate_limit(ip: str) -> bool:
-    now   = time.time()
-    entry = _rate_store[ip]
-    if now > entry["reset_at"]:
-        entry["count"]    = 0
-        entry["reset_at"] = now + RATE_WINDOW
-    entry["count"] += 1
-    return entry["count"] <= RATE_MAX
+    if _rate_redis is not None:
+        try: return _check_rate_limit_redis(ip)
+        except redis.RedisError as e: print(f"Redis rate limit error: {e}")
+    global _rate_calls
+    now = time.monotonic()
+    with _rate_lock:
+        _rate_calls += 1
+        if _rate_calls % RATE_SWEEP_EVERY == 0: _sweep_rate_limit(now)
+        tat = max(_rate_store.pop(ip, now), now)
+        if tat - now > RATE_BURST:
+            _rate_store[ip] = tat
+            return False
+        if len(_rate_store) >= RATE_MAX_IPS: _rate_store.popitem(last=False)
+        _rate_store[ip] = tat + RATE_INTERVAL
+        return True
+
+def _sweep_rate_limit(now: float):
+    """Снимает истёкшие IP с головы LRU до первого живого (вызывать под _rate_lock)"""
+    # TAT не уходит дальше последнего обращения + RATE_WINDOW, а LRU упорядочен по обращениям —
+    # за первым живым почти всегда живые, так что работа пропорциональна числу истёкших, а не всех IP
+    while _rate_store:
+        ip = next(iter(_rate_store))
+        if _rate_store[ip] > now: break
+        del _rate_store[ip]
 
 # ── Minecraft ping ────────────────────────────────────────────────────────
+_PORT_STRUCT = struct.Struct(">H")
+
+# Длина VarInt по bit_length и маска continuation-битов для всех байт, кроме последнего
+_VARINT_LEN  = [max(1, (bits + 6) // 7) for bits in range(33)]
+_VARINT_CONT = [0] + [sum(0x80 << 8 * i for i in range(n - 1)) for n in range(1, 6)]
+# Однобайтовые VarInt (id пакетов, state, короткие длины) — готовые bytes без арифметики
+_VARINT_1B   = [bytes((i,)) for i in range(0x80)]
+
 def _write_varint(value: int) -> bytes:
-    out = b""
-    while True:
-        b = value & 0x7F
-        value >>= 7
-        if value: b |= 0x80
-        out += bytes([b])
-        if not value: break
-    return out
-
-def _read_varint(stream) -> int:
+    # Без цикла: раскладываем 7-битные группы по байтам сдвигами и ставим continuation-биты маской
+    value &= 0xFFFFFFFF
+    if value < 0x80: return _VARINT_1B[value]
+    n = _VARINT_LEN[value.bit_length()]
+    spread = ((value & 0x7F) | (value & 0x3F80) << 1 | (value & 0x1FC000) << 2
+              | (value & 0xFE00000) << 3 | (value & 0xF0000000) << 4)
+    return (spread | _VARINT_CONT[n]).to_bytes(n, "little")
+
+def _read_varint(buf, off: int = 0) -> tuple[int, int]:
+    """VarInt из буфера начиная с off → (значение, позиция после него)"""
+    if off < len(buf) and buf[off] < 0x80: return buf[off], off + 1
     result = 0; shift = 0
     while True:
-        b = stream.read(1)
-        if not b: raise EOFError("Connection closed")
-        byte = b[0]
+        if off >= len(buf): raise EOFError("Connection closed")
+        byte = buf[off]; off += 1
         result |= (byte & 0x7F) << shift
-        if not (byte & 0x80): return result
+        if not (byte & 0x80): return result, off
         shift += 7
         if shift >= 35: raise ValueError("VarInt too large")
 
-def ping_minecraft(host: str, port: int, timeout: float = 5.0) -> dict:
+async def _read_packet(reader: asyncio.StreamReader) -> bytearray:
+    """Пакет целиком: заголовок с длиной — одним read, остаток — одним readexactly"""
+    head = bytearray()
+    while len(head) < 5 and not any(b < 0x80 for b in head):
+        chunk = await reader.read(5 - len(head))
+        if not chunk: raise EOFError("Connection closed")
+        head += chunk
+    length, off = _read_varint(head)
+    body = head[off:off + length]
+    if len(body) < length: body += await reader.readexactly(length - len(body))
+    return body
+
+def _build_handshake(host: str, port: int) -> bytes:
+    """Handshake-пакет с next state = status"""
     addr_enc   = host.encode("utf-8")
     handshake  = (_write_varint(0x00) + _write_varint(762)
                   + _write_varint(len(addr_enc)) + addr_enc
-                  + struct.pack(">H", port) + _write_varint(1))
-    packet     = _write_varint(len(handshake)) + handshake
-    status_req = _write_varint(1) + _write_varint(0x00)
-    with socket.create_connection((host, port), timeout=timeout) as sock:
-        sock.sendall(packet + status_req)
-        stream = sock.makefile("rb")
-        _read_varint(stream); _read_varint(stream)
-        data = json.loads(stream.read(_read_varint(stream)).decode())
+                  + _PORT_STRUCT.pack(port) + _write_varint(1))
+    return _write_varint(len(handshake)) + handshake
+
+# MC_HOST/MC_PORT не меняются — handshake для поллера собираем один раз
+_HANDSHAKE_PKT = _build_handshake(MC_HOST, MC_PORT)
+_STATUS_REQ    = b"\x01\x00"   # длина 1, packet id 0x00
+
+def _parse_status(resp: bytearray) -> dict:
+    _, off    = _read_varint(resp)            # packet id
+    size, off = _read_varint(resp, off)
+    data = _loads(resp[off:off + size])
     return {
         "online":         True,
         "players_online": data.get("players", {}).get("online", 0),
@@ -83,16 +197,62 @@ def ping_minecraft(host: str, port: int, timeout: float = 5.0) -> dict:
         "version":        data.get("version", {}).get("name", "?"),
     }
 
-def _refresh_status():
+# ── Status poller ─────────────────────────────────────────────────────────
+# Один поток с asyncio-циклом: новые цели опроса — это новые задачи в _status_loop, а не новые потоки
+OFFLINE_STATUS = {"online": False, "players_online": 0, "players_max": 0, "version": "?"}
+
+# (host, port) для MC_HOST — DNS дёргаем один раз, а не на каждый пинг
+_mc_addr: tuple | None = None
+
+def _make_snapshot(result: dict, updated_at: float) -> tuple[dict, float, bytes, str]:
+    payload = _dumps({**result, "updated_at": updated_at})
+    return result, updated_at, payload, _etag(payload)
+
+# (data, updated_at, payload, etag) — поллер подменяет кортеж целиком, читатели берут ссылку без лока.
+# До первого пинга отдаём «офлайн» с updated_at = 0 — у читателей нет ветки на пустой снапшот
+_status_snapshot: tuple[dict, float, bytes, str] = _make_snapshot(OFFLINE_STATUS, 0)
+
+def _publish_status(result: dict, updated_at: float):
+    global _status_snapshot
+    _status_snapshot = _make_snapshot(result, updated_at)
+
+async def _ping_mc_async() -> dict:
+    global _mc_addr
+    if _mc_addr is None:
+        infos = await asyncio.get_running_loop().getaddrinfo(MC_HOST, MC_PORT, type=socket.SOCK_STREAM)
+        _mc_addr = infos[0][4][:2]
+    try: reader, writer = await asyncio.open_connection(*_mc_addr)
+    except OSError:
+        # Возможно, хост переехал — в следующий раз резолвим заново
+        _mc_addr = None
+        raise
+    try:
+        # asyncio сам включает TCP_NODELAY; handshake и запрос — одной записью
+        writer.write(_HANDSHAKE_PKT + _STATUS_REQ)
+        return _parse_status(await _read_packet(reader))
+    finally:
+        writer.close()
+
+async def _poll_status():
+    fails = 0
     while True:
-        try: result = ping_minecraft(MC_HOST, MC_PORT)
-        except: result = {"online": False, "players_online": 0, "players_max": 0, "version": "?"}
-        with _status_lock:
-            _status_cache["data"] = result
-            _status_cache["updated_at"] = time.time()
-        time.sleep(10)
-
-Thread(target=_refresh_status, daemon=True).start()
+        try:
+            result = await asyncio.wait_for(_ping_mc_async(), STATUS_TIMEOUT)
+            delay  = STATUS_INTERVAL; fails = 0
+        except Exception:
+            result = OFFLINE_STATUS
+            # Сервер лежит — пингуем всё реже: 10 → 20 → … → 300 сек
+            delay  = min(STATUS_MAX_DELAY, STATUS_INTERVAL * 2 ** fails); fails = min(fails + 1, 5)
+        _publish_status(result, time.time())
+        await asyncio.sleep(delay)
+
+def _run_status_loop():
+    _status_loop.create_task(_poll_status())
+    _status_loop.run_forever()
+
+_status_loop = asyncio.new_event_loop()
+Thread(target=_run_status_loop, name="mc-status", daemon=True).start()
+atexit.register(_status_loop.call_soon_threadsafe, _status_loop.stop)
 
 # ── News helpers ──────────────────────────────────────────────────────────
 DEFAULT_NEWS = []
@@ -101,25 +261,151 @@ DEFAULT_NEWS = []
 def load_json(path: Path, default):
     if path.exists():
         try:
-            content = path.read_text(encoding="utf-8").strip()
-            if content:
-                data = json.loads(content)
+            content = path.read_bytes()
+            if content.strip():
+                data = _loads(content)
                 if isinstance(data, list): return data
         except Exception as e:
             print(f"Warning loading {path}: {e}")
     save_json(path, default)
-    return list(default)
+    return [dict(item) for item in default]
 
-def save_json(path: Path, data):
+def save_json(path: Path, data) -> bool:
     try:
         tmp = path.with_suffix(".json.tmp")
-        tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+        with open(tmp, "wb") as f:
+            f.write(_dumps(data, indent=True)); f.flush(); os.fsync(f.fileno())
         tmp.replace(path)
+        return True
     except Exception as e:
         print(f"Save error {path}: {e}")
-
-def load_news(): return load_json(NEWS_FILE, DEFAULT_NEWS)
-def save_news(d): save_json(NEWS_FILE, d)
+        return False
+
+def _mtime_ns(path: Path) -> int:
+    try: return path.stat().st_mtime_ns
+    except FileNotFoundError: return 0
+
+# Распарсенный и сериализованный JSON-файл живёт в памяти, пока mtime файла не изменился.
+# Правка помечает кэш dirty и ставит его в _save_queue; фоновый писатель забирает всё,
+# что накопилось в очереди, и пишет каждый файл один раз — запрос не ждёт диска
+_save_queue: Queue = Queue()
+# Не удалось записать (диск полон, нет прав) — правка остаётся в памяти, повторяем через паузу
+SAVE_RETRY_DELAY = 5
+
+def _new_cache(path: Path, default: list, sort_key=None) -> dict:
+    # gen растёт с каждой правкой — писатель по нему понимает, не устарел ли записанный снимок;
+    # io_lock не даёт фоновому писателю и atexit-флашу писать один файл одновременно
+    return {"path": path, "default": default, "sort_key": sort_key, "lock": Lock(), "io_lock": Lock(),
+            "mtime": 0, "data": None, "index": {}, "serialized": b"", "etag": "", "dirty": False, "gen": 0}
+
+def _build_index(data: list) -> dict:
+    # Записи без id (руками поправленный файл) в индекс не попадают — их отдаём, но не правим
+    return {item["id"]: i for i, item in enumerate(data) if isinstance(item, dict) and "id" in item}
+
+def _set_cache(cache: dict, data: list):
+    cache["data"]       = data
+    cache["index"]      = _build_index(data)
+    cache["serialized"] = _dumps(data)
+    cache["etag"]       = _etag(cache["serialized"])
+    cache["mtime"]      = _mtime_ns(cache["path"])
+
+def _fresh_cache(cache: dict) -> dict:
+    """Вызывать под cache["lock"]"""
+    mtime = _mtime_ns(cache["path"])
+    if cache["data"] is None or (not cache["dirty"] and mtime != cache["mtime"]):
+        data = load_json(cache["path"], cache["default"])
+        if cache["sort_key"]: data.sort(key=cache["sort_key"])
+        _set_cache(cache, data)
+    return cache
+
+def _mark_dirty(cache: dict):
+    cache["gen"]  += 1
+    cache["dirty"] = True
+    _save_queue.put_nowait(cache)
+
+def _commit(cache: dict, data: list):
+    _set_cache(cache, data)
+    _mark_dirty(cache)
+
+def _save_cached(cache: dict, data: list):
+    with cache["lock"]: _commit(cache, list(data))
+
+def _prepend_cached(cache: dict, item: dict):
+    """Новая запись в начало списка: тело ответа дописываем к готовым байтам, а не сериализуем заново"""
+    with cache["lock"]:
+        _fresh_cache(cache)
+        data, tail = cache["data"], cache["serialized"][1:]
+        data.insert(0, item)
+        cache["index"]      = _build_index(data)
+        cache["serialized"] = b"[" + _dumps(item) + (b"," + tail if len(data) > 1 else tail)
+        cache["etag"]       = _etag(cache["serialized"])
+        _mark_dirty(cache)
+
+def _append_cached(cache: dict, item: dict, order_key: str | None = None):
+    """Новая запись в конец списка; order_key получает значение последней записи + 1 — под тем же локом"""
+    with cache["lock"]:
+        _fresh_cache(cache)
+        data, head = cache["data"], cache["serialized"][:-1]
+        if order_key: item[order_key] = data[-1].get(order_key, 0) + 1 if data else 0
+        data.append(item)
+        cache["index"][item["id"]] = len(data) - 1
+        cache["serialized"] = head + (b"," if len(data) > 1 else b"") + _dumps(item) + b"]"
+        cache["etag"]       = _etag(cache["serialized"])
+        _mark_dirty(cache)
+
+def _update_cached(cache: dict, item_id: int, data: dict, fields: tuple) -> dict | None:
+    """Переносит в запись по id разрешённые поля из data; None — если такой нет"""
+    with cache["lock"]:
+        _fresh_cache(cache)
+        idx = cache["index"].get(item_id)
+        if idx is None: return None
+        item = cache["data"][idx]
+        for k in fields:
+            if k in data: item[k] = data[k]
+        _commit(cache, cache["data"])
+        return dict(item)
+
+def _remove_cached(cache: dict, item_id: int) -> bool:
+    with cache["lock"]:
+        _fresh_cache(cache)
+        idx = cache["index"].get(item_id)
+        if idx is None: return False
+        del cache["data"][idx]
+        _commit(cache, cache["data"])
+        return True
+
+def _payload_cached(cache: dict) -> tuple[bytes, str]:
+    """Готовое JSON-тело и ETag по его содержимому"""
+    with cache["lock"]:
+        _fresh_cache(cache)
+        return cache["serialized"], cache["etag"]
+
+def _flush_cached(cache: dict):
+    with cache["io_lock"]:
+        # Под локом только снимок: записи правятся на месте, поэтому копируем и их
+        with cache["lock"]:
+            if not cache["dirty"]: return
+            gen, data = cache["gen"], [dict(item) if isinstance(item, dict) else item for item in cache["data"]]
+        # Сериализация и fsync — без лока: GET и правки в это время не ждут диска
+        if not save_json(cache["path"], data):
+            retry = Timer(SAVE_RETRY_DELAY, _save_queue.put_nowait, (cache,))
+            retry.daemon = True; retry.start()
+            return
+        with cache["lock"]:
+            cache["mtime"] = _mtime_ns(cache["path"])
+            # Пока писали, пришла новая правка — кэш остаётся dirty, она уже стоит в очереди
+            if cache["gen"] == gen: cache["dirty"] = False
+
+_news_cache = _new_cache(NEWS_FILE, DEFAULT_NEWS)
+
+def save_news(d): _save_cached(_news_cache, d)
+def news_payload(): return _payload_cached(_news_cache)
+def prepend_news(item: dict): _prepend_cached(_news_cache, item)
+
+NEWS_FIELDS = ("type", "typeLabel", "date", "title", "text", "tags")
+
+def update_news(news_id: int, data: dict): return _update_cached(_news_cache, news_id, data, NEWS_FIELDS)
+def remove_news(news_id: int): return _remove_cached(_news_cache, news_id)
 
 # ── Docs helpers ──────────────────────────────────────────────────────────
 DEFAULT_DOCS = [
@@ -192,140 +478,184 @@ DEFAULT_DOCS = [
 ]
 
 
-def load_docs(): return load_json(DOCS_FILE, DEFAULT_DOCS)
-def save_docs(d): save_json(DOCS_FILE, d)
+# Доки держим отсортированными по order: сортируем только при чтении с диска,
+# а обработчики правок сохраняют порядок сами (добавление в конец, move меняет соседей местами)
+_docs_cache = _new_cache(DOCS_FILE, DEFAULT_DOCS, sort_key=lambda d: d.get("order", 0))
+
+def save_docs(d): _save_cached(_docs_cache, d)
+def docs_payload(): return _payload_cached(_docs_cache)
+def append_doc(item: dict): _append_cached(_docs_cache, item, order_key="order")
+
+DOC_FIELDS = ("category", "title", "lead", "body")
+
+def update_doc(doc_id: int, data: dict): return _update_cached(_docs_cache, doc_id, data, DOC_FIELDS)
+def remove_doc(doc_id: int): return _remove_cached(_docs_cache, doc_id)
+
+def shift_doc(doc_id: int, direction: int) -> bool:
+    """Меняет док местами с соседом (-1 — вверх, 1 — вниз); False — если такого нет"""
+    with _docs_cache["lock"]:
+        cache = _fresh_cache(_docs_cache)
+        docs  = cache["data"]
+        i = cache["index"].get(doc_id)
+        if i is None: return False
+        j = i + direction
+        if 0 <= j < len(docs):
+            docs[i]["order"], docs[j]["order"] = docs[j]["order"], docs[i]["order"]
+            docs[i], docs[j] = docs[j], docs[i]
+            _commit(cache, docs)
+        return True
+
+def flush_json():
+    for cache in (_news_cache, _docs_cache): _flush_cached(cache)
+
+def _save_writer():
+    while True:
+        cache   = _save_queue.get()
+        pending = {id(cache): cache}
+        while True:
+            try: cache = _save_queue.get_nowait()
+            except Empty: break
+            pending[id(cache)] = cache
+        for cache in pending.values(): _flush_cached(cache)
+
+Thread(target=_save_writer, daemon=True).start()
+atexit.register(flush_json)
+
+# ── Auth ──────────────────────────────────────────────────────────────────
+def check_password(password: str) -> bool:
+    # Сравниваем сырые 32 байта digest, без hexdigest
+    return hmac.compare_digest(hashlib.sha256(password.encode()).digest(), _ADMIN_DIGEST)
 
 # ── Routes ────────────────────────────────────────────────────────────────
+# index.html читаем один раз при старте — без stat/open на каждый заход (после правок нужен рестарт)
+# Путь — от папки приложения, как у send_from_directory; без файла отдаём 404, а не падаем на импорте
+_INDEX_PATH = Path(app.root_path) / "index.html"
+_INDEX_HTML = _INDEX_PATH.read_bytes() if _INDEX_PATH.is_file() else None
+_INDEX_ETAG = hashlib.blake2b(_INDEX_HTML, digest_size=8).hexdigest() if _INDEX_HTML else ""
+
 @app.get("/")
-def index(): return send_from_directory(".", "index.html")
+def index():
+    if _INDEX_HTML is None: abort(404)
+    resp = Response(_INDEX_HTML, mimetype="text/html")
+    resp.set_etag(_INDEX_ETAG)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp.make_conditional(request)
 
 @app.post("/api/reset")
 def reset_data():
     """Сброс docs.json и news.json к дефолтным значениям (требует пароль)"""
+    # Тот же лимит, что и у /auth, и до хеширования — перебор пароля через reset тоже упирается в 429
+    if not check_rate_limit(request.remote_addr):
+        return _json_response({"ok": False, "error": "Too many requests"}, 429)
     data = request.get_json(silent=True) or {}
     password = data.get("password", "")
-    if not password or not hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), ADMIN_PASSWORD_HASH):
-        return jsonify({"ok": False, "error": "Unauthorized"}), 401
-    save_json(DOCS_FILE, DEFAULT_DOCS)
-    save_json(NEWS_FILE, DEFAULT_NEWS)
-    return jsonify({"ok": True, "message": "Данные сброшены к дефолтным"})
+    if not password or not check_password(password):
+        return _json_response({"ok": False, "error": "Unauthorized"}, 401)
+    save_docs([dict(d) for d in DEFAULT_DOCS])
+    save_news(DEFAULT_NEWS)
+    return _json_response({"ok": True, "message": "Данные сброшены к дефолтным"})
 
 @app.get("/api/status")
 def get_status():
-    with _status_lock:
-        data = _status_cache["data"]; updated_at = _status_cache["updated_at"]
-    if data is None:
-        return jsonify({"online": False, "players_online": 0, "players_max": 0, "version": "?", "updated_at": 0})
-    return jsonify({**data, "updated_at": updated_at})
+    snapshot = _status_snapshot
+    # Поллер обновляет статус раз в STATUS_INTERVAL — пару секунд можно отдавать из кэша браузера/CDN
+    return _cached_response(snapshot[2], snapshot[3], "public, max-age=5")
 
 @app.post("/auth")
 def auth():
-    ip = request.headers.get("x-forwarded-for", request.remote_addr).split(",")[0].strip()
-    if not check_rate_limit(ip):
-        return jsonify({"ok": False, "error": "Too many requests"}), 429
+    if not check_rate_limit(request.remote_addr):
+        return _json_response({"ok": False, "error": "Too many requests"}, 429)
     data = request.get_json(silent=True) or {}
     password = data.get("password", "")
-    if not password: return jsonify({"ok": False}), 400
-    ok = hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), ADMIN_PASSWORD_HASH)
-    return jsonify({"ok": ok}), 200 if ok else 401
+    if not password: return _json_response({"ok": False}, 400)
+    ok = check_password(password)
+    return _json_response({"ok": ok}, 200 if ok else 401)
 
 # ── News API ──────────────────────────────────────────────────────────────
 @app.get("/api/news")
-def get_news(): return jsonify(load_news())
+def get_news(): return _cached_response(*news_payload())
 
 @app.post("/api/news")
 def add_news():
     data = request.get_json(silent=True) or {}
     if not data.get("title") or not data.get("text"):
-        return jsonify({"ok": False, "error": "title and text required"}), 400
-    news = load_news()
+        return _json_response({"ok": False, "error": "title and text required"}, 400)
     item = {"id": int(time.time()*1000), "type": data.get("type","info"),
             "typeLabel": data.get("typeLabel","Инфо"), "date": data.get("date",""),
             "title": data["title"], "text": data["text"], "tags": data.get("tags",[])}
-    news.insert(0, item); save_news(news)
-    return jsonify({"ok": True, "item": item})
+    prepend_news(item)
+    return _json_response({"ok": True, "item": item})
 
 @app.put("/api/news/<int:news_id>")
 def edit_news(news_id):
     data = request.get_json(silent=True) or {}
-    news = load_news()
-    for i, item in enumerate(news):
-        if item["id"] == news_id:
-            news[i] = {**item, **{k: data[k] for k in ["type","typeLabel","date","title","text","tags"] if k in data}}
-            save_news(news); return jsonify({"ok": True, "item": news[i]})
-    return jsonify({"ok": False, "error": "not found"}), 404
+    item = update_news(news_id, data)
+    if item is None: return _json_response({"ok": False, "error": "not found"}, 404)
+    return _json_response({"ok": True, "item": item})
 
 @app.delete("/api/news/<int:news_id>")
 def delete_news(news_id):
-    news = load_news()
-    new_news = [n for n in news if n["id"] != news_id]
-    if len(new_news) == len(news): return jsonify({"ok": False, "error": "not found"}), 404
-    save_news(new_news); return jsonify({"ok": True})
+    if not remove_news(news_id): return _json_response({"ok": False, "error": "not found"}, 404)
+    return _json_response({"ok": True})
 
 # ── Docs API ──────────────────────────────────────────────────────────────
 @app.get("/api/docs")
-def get_docs():
-    docs = load_docs()
-    docs.sort(key=lambda d: d.get("order", 0))
-    return jsonify(docs)
+def get_docs(): return _cached_response(*docs_payload())
 
 @app.post("/api/docs")
 def add_doc():
     data = request.get_json(silent=True) or {}
     if not data.get("title"):
-        return jsonify({"ok": False, "error": "title required"}), 400
-    docs = load_docs()
-    max_order = max((d.get("order", 0) for d in docs), default=-1)
+        return _json_response({"ok": False, "error": "title required"}, 400)
     item = {
         "id":       int(time.time()*1000),
         "category": data.get("category", "Общее"),
         "title":    data["title"],
         "lead":     data.get("lead", ""),
         "body":     data.get("body", ""),
-        "order":    max_order + 1,
     }
-    docs.append(item); save_docs(docs)
-    return jsonify({"ok": True, "item": item})
+    append_doc(item)
+    return _json_response({"ok": True, "item": item})
 
 @app.put("/api/docs/<int:doc_id>")
 def edit_doc(doc_id):
     data = request.get_json(silent=True) or {}
-    docs = load_docs()
-    for i, item in enumerate(docs):
-        if item["id"] == doc_id:
-            for k in ["category", "title", "lead", "body"]:
-                if k in data: docs[i][k] = data[k]
-            save_docs(docs); return jsonify({"ok": True, "item": docs[i]})
-    return jsonify({"ok": False, "error": "not found"}), 404
+    item = update_doc(doc_id, data)
+    if item is None: return _json_response({"ok": False, "error": "not found"}, 404)
+    return _json_response({"ok": True, "item": item})
 
 @app.delete("/api/docs/<int:doc_id>")
 def delete_doc(doc_id):
-    docs = load_docs()
-    new_docs = [d for d in docs if d["id"] != doc_id]
-    if len(new_docs) == len(docs): return jsonify({"ok": False, "error": "not found"}), 404
-    save_docs(new_docs); return jsonify({"ok": True})
+    if not remove_doc(doc_id): return _json_response({"ok": False, "error": "not found"}, 404)
+    return _json_response({"ok": True})
 
 @app.post("/api/docs/<int:doc_id>/move")
 def move_doc(doc_id):
     data = request.get_json(silent=True) or {}
     direction = int(data.get("direction", 1))  # -1 = up, 1 = down
-    docs = load_docs()
-    docs.sort(key=lambda d: d.get("order", 0))
-    idx = next((i for i, d in enumerate(docs) if d["id"] == doc_id), None)
-    if idx is None: return jsonify({"ok": False}), 404
-    swap = idx + direction
-    if 0 <= swap < len(docs):
-        docs[idx]["order"], docs[swap]["order"] = docs[swap]["order"], docs[idx]["order"]
-        save_docs(docs)
-    return jsonify({"ok": True})
+    if not shift_doc(doc_id, direction): return _json_response({"ok": False}, 404)
+    return _json_response({"ok": True})
+
+_HEALTH_BODY = b'{"status":"ok"}'
 
 @app.get("/health")
-def health(): return jsonify({"status": "ok"})
+def health(): return Response(_HEALTH_BODY, mimetype="application/json")
 
 if __name__ == "__main__":
     if not ADMIN_PASSWORD_HASH:
         print("⚠️  ВНИМАНИЕ: ADMIN_PASSWORD_HASH не задан в .env!")
+    elif len(_ADMIN_DIGEST) != hashlib.sha256().digest_size:
+        print("⚠️  ВНИМАНИЕ: ADMIN_PASSWORD_HASH не похож на SHA-256 hex!")
     else:
         print("✅ Auth ready")
-    print(f"🔍 Пингуем {MC_HOST}:{MC_PORT} каждые 10 сек...")
-    app.run(host="0.0.0.0", port=PORT)
+    if REDIS_URL and _rate_redis is None:
+        print("⚠️  REDIS_URL задан, но пакет redis не установлен — лимит считается в памяти")
+    print(f"🔍 Пингуем {MC_HOST}:{MC_PORT} каждые {STATUS_INTERVAL} сек...")
+    # Linux-прод — gunicorn server:app (см. gunicorn.conf.py); здесь — переносимый waitress с пулом потоков
+    try:
+        from waitress import serve
+    except ImportError:
+        print("ℹ️  waitress не установлен — запускаем dev-сервер Flask")
+        app.run(host="0.0.0.0", port=PORT, threaded=True)
+    else:
+        serve(app, host="0.0.0.0", port=PORT, threads=16)